@@ -5,15 +5,50 @@ import pandas as pd
 import ssl
 import certifi
 import urllib.request
+import urllib.error
 import io
 import os
+import threading
+import re
+import random
+import hashlib
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def construct_download_url(ticker, period1, period2, interval='daily'):
-    def convert_to_seconds(period):
-        datetime_value = datetime.strptime(period, '%Y-%m-%d')
-        total_seconds = int(time.mktime(datetime_value.timetuple()))
-        return total_seconds
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+
+# Number of tickers downloaded concurrently
+MAX_WORKERS = 8
+
+# Matches each line of the tickers file: rank and ticker for lines such as
+# "1. BTC-USD", otherwise the whole line so it can be reported as invalid
+TICKER_LINE_RE = re.compile(r'^[ \t]*(?:(\d+)\.[ \t]+(\S+)|(.*?))[ \t]*\r?$', re.ASCII | re.MULTILINE)
+
+# Retry settings for rate-limited or failing requests
+MAX_RETRIES = 3
+RETRY_BASE_SLEEP = 1.0
+RETRY_MAX_SLEEP = 30.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
 
+# Raw downloads are cached on disk and reused for this many seconds
+CACHE_MAX_AGE = 24 * 60 * 60
+CACHE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+# Built once so the CA bundle is not re-parsed for every download
+SSL_CONTEXT = ssl.create_default_context(cafile=certifi.where())
+
+@lru_cache(maxsize=None)
+def convert_to_seconds(period):
+    # Every ticker shares the same dates, so only parse each one once
+    datetime_value = datetime.strptime(period, '%Y-%m-%d')
+    total_seconds = int(time.mktime(datetime_value.timetuple()))
+    return total_seconds
+
+def construct_download_url(ticker, period1, period2, interval='daily'):
     try:
         interval_reference = {'daily': '1d', 'weekly': '1wk', 'monthly': '1mo'}
         _interval = interval_reference.get(interval, '1d')
@@ -24,24 +59,103 @@ def construct_download_url(ticker, period1, period2, interval='daily'):
         print(f"Error in constructing URL: {e}")
         return None
 
+def fetch_data(query_url):
+    # Only back off on rate limits and server errors; anything else fails fast
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            with urllib.request.urlopen(query_url, context=SSL_CONTEXT) as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            if e.code not in RETRYABLE_STATUS or attempt == MAX_RETRIES:
+                raise
+            # Release the error response's connection before waiting to retry
+            e.close()
+            # Jitter keeps the worker threads from retrying in lockstep
+            delay = RETRY_BASE_SLEEP * 2 ** attempt
+            time.sleep(min(RETRY_MAX_SLEEP, random.uniform(delay, delay * 2)))
+
+def get_cache_file_path(query_url):
+    # The URL already encodes ticker, dates and interval, so it is the cache key
+    return os.path.join(CACHE_FOLDER, hashlib.sha1(query_url.encode('utf-8')).hexdigest() + '.csv')
+
+def read_cached_data(cache_file_path):
+    # Return the cached body if it is still fresh, removing it once expired
+    try:
+        if time.time() - os.path.getmtime(cache_file_path) < CACHE_MAX_AGE:
+            with open(cache_file_path, 'rb') as f:
+                return f.read()
+        os.remove(cache_file_path)
+    except OSError:
+        pass
+    return None
+
+def write_cached_data(cache_file_path, data):
+    # The cache is only an optimisation, so a failed write is reported and skipped
+    tmp_file_path = f'{cache_file_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        ensure_dir(CACHE_FOLDER)
+        # Write to a temporary file first so other threads never read a partial file
+        with open(tmp_file_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file_path, cache_file_path)
+    except OSError as e:
+        print(f"Could not cache data at {cache_file_path}: {e}")
+    finally:
+        try:
+            os.remove(tmp_file_path)
+        except OSError:
+            pass
+
+def prune_cache():
+    # Remove entries older than CACHE_MAX_AGE so old date ranges do not pile up
+    try:
+        file_names = os.listdir(CACHE_FOLDER)
+    except OSError:
+        return
+    now = time.time()
+    for file_name in file_names:
+        file_path = os.path.join(CACHE_FOLDER, file_name)
+        try:
+            if now - os.path.getmtime(file_path) >= CACHE_MAX_AGE:
+                os.remove(file_path)
+        except OSError:
+            pass
+
+def read_price_csv(data):
+    # Parse the raw response bytes, with pyarrow when it is installed
+    if pa is not None:
+        table = pacsv.read_csv(
+            pa.py_buffer(data),
+            convert_options=pacsv.ConvertOptions(column_types={'Date': pa.string()}),
+        )
+        return table.to_pandas()
+    return pd.read_csv(io.BytesIO(data))
+
+@lru_cache(maxsize=None)
+def ensure_dir(path):
+    # Cached so each folder is only checked once per run
+    os.makedirs(path, exist_ok=True)
+    return path
+
 def download_and_save_data(ticker, crypto_name, idx, start_date, end_date):
+    print(f"Processing {ticker} with rank {idx}")
     base_output_folder = os.path.dirname(os.path.abspath(__file__))
     csv_folder = os.path.join(base_output_folder, 'CSV')
     json_folder = os.path.join(base_output_folder, 'JSON')
 
-    # Create directories if they do not exist
-    os.makedirs(csv_folder, exist_ok=True)
-    os.makedirs(json_folder, exist_ok=True)
-
     query_url = construct_download_url(ticker, start_date, end_date)
     if query_url:
-        print(f"Downloading data for {crypto_name} from {query_url}")
         try:
-            ssl_context = ssl.create_default_context(cafile=certifi.where())
-            with urllib.request.urlopen(query_url, context=ssl_context) as response:
-                data = response.read()
+            cache_file_path = get_cache_file_path(query_url)
+            data = read_cached_data(cache_file_path)
+            from_cache = data is not None
+            if from_cache:
+                print(f"Using cached data for {crypto_name}")
+            else:
+                print(f"Downloading data for {crypto_name} from {query_url}")
+                data = fetch_data(query_url)
 
-            df = pd.read_csv(io.StringIO(data.decode('utf-8')))
+            df = read_price_csv(data)
             df.set_index('Date', inplace=True)
             df['Crypto'] = crypto_name
             df['Rank'] = idx
@@ -49,30 +163,62 @@ def download_and_save_data(ticker, crypto_name, idx, start_date, end_date):
             csv_file_path = os.path.join(csv_folder, f'{idx}.{crypto_name}.csv')
             json_file_path = os.path.join(json_folder, f'{idx}.{crypto_name}.json')
 
+            # Create directories on first write if they do not exist
+            ensure_dir(csv_folder)
+            ensure_dir(json_folder)
             df.to_csv(csv_file_path)
+            # Yahoo can repeat the last row; keep the latest one per date as df.T.to_dict() did
             with open(json_file_path, 'w') as f:
-                json.dump(df.T.to_dict(), f, indent=4)
+                json.dump(df[~df.index.duplicated(keep='last')].to_dict(orient='index'), f, indent=4)
 
             print(f"Data for {crypto_name} has been saved as CSV and JSON in separate folders.")
+
+            # Only cache responses that parsed and saved as price data
+            if not from_cache:
+                write_cached_data(cache_file_path, data)
         except Exception as e:
             print(f"Error retrieving or saving data for {ticker}: {e}")
     else:
         print(f"Failed to construct a valid URL for {ticker}.")
 
+def iter_tickers(text):
+    for match in TICKER_LINE_RE.finditer(text):
+        idx, ticker, invalid = match.groups()
+        if ticker:
+            yield int(idx), ticker
+        elif invalid:
+            print(f"Invalid line format: {invalid}")
+
+def load_tickers(path):
+    # Read the whole file once and scan every line in a single regex pass
+    with open(path, 'r') as file:
+        text = file.read()
+
+    # Drop repeated entries so no two workers write the same output files
+    return list(dict.fromkeys(iter_tickers(text)))
+
 def main():
     start_date = input("Enter the start date (YYYY-MM-DD): ")
     end_date = input("Enter the end date (YYYY-MM-DD): ")
 
-    with open('crypto_tickers.txt', 'r') as file:
-        for line in file:
-            parts = line.strip().split('. ')
-            if len(parts) == 2:
-                idx, ticker = parts
-                idx = int(idx)
-                print(f"Processing {ticker} with rank {idx}")
-                download_and_save_data(ticker, ticker, idx, start_date, end_date)
-            else:
-                print(f"Invalid line format: {line.strip()}")
+    tickers = load_tickers('crypto_tickers.txt')
+    prune_cache()
+
+    # Downloads are network bound, so fetch several tickers at once
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    try:
+        futures = [
+            executor.submit(download_and_save_data, ticker, ticker, idx, start_date, end_date)
+            for idx, ticker in tickers
+        ]
+        # download_and_save_data reports its own errors, so this only waits
+        for future in as_completed(futures):
+            future.result()
+    except KeyboardInterrupt:
+        # Stop on Ctrl-C instead of running every queued download first
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
 
 if __name__ == '__main__':
     main()